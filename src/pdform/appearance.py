@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from hashlib import sha1
+from pikepdf import AcroFormField, Annotation, Dictionary, Name, Object, Stream
+from pikepdf.form import ExtendedAppearanceStreamGenerator
+from typing import Callable, NamedTuple, Optional, Tuple
+import re
+
+
+_da_font_re = re.compile(rb'/([^\s/\[\]()<>{}%]+)\s+[-+.\d]+\s+Tf')
+
+
+class CachedAppearance(NamedTuple):
+    data: bytes
+    bbox: Tuple[float, ...]
+    matrix: Optional[Tuple[float, ...]]
+    font_names: Tuple[str, ...]
+
+
+class AppearanceStreamCache:
+    """
+    A cache of generated appearance streams for text and choice fields.
+
+    Entries are keyed by everything that affects how the field is drawn (the widget size, default
+    appearance and font, quadding, and value), so the same cache may safely be shared by every
+    document filled in a batch, even if they come from different templates.
+
+    :param max_size: The maximum number of appearances to keep. The least recently used are
+        discarded first.
+    """
+    def __init__(self, max_size:int = 10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key) -> Optional[CachedAppearance]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry:CachedAppearance):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachingAppearanceStreamGenerator(ExtendedAppearanceStreamGenerator):
+    """
+    Appearance stream generator which reuses previously generated appearances for fields that look
+    the same, rather than building a fresh stream for each one.
+
+    Within a document, widgets with the same appearance share a single Form XObject. Across
+    documents, the generated content is kept in an :class:`AppearanceStreamCache` so it only needs
+    to be laid out once per batch.
+
+    To use a shared cache, pass a partial to :class:`pikepdf.form.Form`:
+
+    .. code-block:: python
+
+        cache = AppearanceStreamCache()
+        form = Form(pdf, partial(CachingAppearanceStreamGenerator, cache=cache))
+    """
+    cache: AppearanceStreamCache
+
+    def __init__(self, pdf, form, cache:Optional[AppearanceStreamCache] = None):
+        super().__init__(pdf, form)
+        self.cache = AppearanceStreamCache() if cache is None else cache
+        self._xobjects = {}
+        self._digests = {}
+
+    def generate_text(self, field:AcroFormField):
+        self._generate(field, super().generate_text)
+
+    def generate_choice(self, field:AcroFormField):
+        self._generate(field, super().generate_choice)
+
+    def _generate(self, field:AcroFormField, generate:Callable[[AcroFormField], None]):
+        annots = self.form.get_annotations_for_field(field)
+        keys = [self._key(field, annot) for annot in annots]
+        xobjects = [self._reuse(field, key) for key in keys]
+        if all(xobj is not None for xobj in xobjects):
+            for annot, xobj in zip(annots, xobjects):
+                _set_normal_appearance(annot, xobj)
+            return
+        for annot in annots:
+            # The default generator rewrites an existing appearance stream in place, which may be
+            # shared with other widgets, so give each its own copy first
+            normal = _normal_appearance(annot)
+            if normal is not None:
+                _set_normal_appearance(annot, self._copy_stream(normal))
+        generate(field)
+        for annot, key in zip(annots, keys):
+            xobj = _normal_appearance(annot)
+            if xobj is None:
+                continue
+            # The default generator only attaches a filter to the stream, which is applied (once)
+            # when it is next read, so write the result back to keep it
+            data = xobj.read_bytes()
+            xobj.write(data)
+            self._xobjects[key] = xobj
+            if field.default_resources is None:
+                continue
+            resources = xobj.get(Name.Resources, Dictionary())
+            matrix = xobj.get(Name.Matrix)
+            self.cache.put(key, CachedAppearance(
+                data,
+                tuple(float(n) for n in xobj.BBox),
+                None if matrix is None else tuple(float(n) for n in matrix),
+                tuple(str(name) for name in resources.get(Name.Font, Dictionary()).keys()),
+            ))
+
+    def _reuse(self, field:AcroFormField, key) -> Optional[Stream]:
+        """Find an existing appearance for the key in this document, or rebuild it from the cache."""
+        xobj = self._xobjects.get(key)
+        if xobj is not None:
+            return xobj
+        if field.default_resources is None:
+            # The fonts can only be found again through the form's default resources
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        dr_fonts = _default_fonts(field)
+        if not all(name in dr_fonts for name in entry.font_names):
+            return None
+        xobj = self.pdf.make_stream(
+            entry.data,
+            Type=Name.XObject,
+            Subtype=Name.Form,
+            FormType=1,
+            BBox=list(entry.bbox),
+            Resources=Dictionary(Font=Dictionary({name: dr_fonts[name] for name in entry.font_names})),
+        )
+        if entry.matrix is not None:
+            xobj.Matrix = list(entry.matrix)
+        self._xobjects[key] = xobj
+        return xobj
+
+    def _key(self, field:AcroFormField, annot:Annotation):
+        rect = annot.rect
+        da = field.default_appearance
+        match = _da_font_re.search(da)
+        font = None
+        if match is not None:
+            font = _default_fonts(field).get('/' + match.group(1).decode('latin-1'))
+        normal = _normal_appearance(annot)
+        return (
+            field.field_type,
+            int(field.flags),
+            bytes(da),
+            field.quadding,
+            str(field.get_inheritable_field_value('/MaxLen')),
+            float(rect.width),
+            float(rect.height),
+            self._digest(annot.obj.get(Name.MK)),
+            self._digest(font),
+            self._digest(normal),
+            field.value_as_string,
+        )
+
+    def _digest(self, obj:Optional[Object]) -> Optional[str]:
+        if obj is None:
+            return None
+        if obj.is_indirect and obj.objgen in self._digests:
+            return self._digests[obj.objgen]
+        if isinstance(obj, Stream):
+            digest = sha1(obj.stream_dict.unparse(resolved=True) + obj.read_raw_bytes()).hexdigest()
+        else:
+            digest = sha1(obj.unparse(resolved=True)).hexdigest()
+        if obj.is_indirect:
+            self._digests[obj.objgen] = digest
+        return digest
+
+    def _copy_stream(self, stream:Stream) -> Stream:
+        copy = self.pdf.make_stream(stream.read_bytes())
+        for key, value in stream.stream_dict.items():
+            if key not in (Name.Length, Name.Filter, Name.DecodeParms):
+                copy[key] = value
+        return copy
+
+
+def _default_fonts(field:AcroFormField) -> Dictionary:
+    # /DR is optional, so may be missing entirely
+    resources = field.default_resources
+    if resources is None:
+        return Dictionary()
+    return resources.get(Name.Font, Dictionary())
+
+
+def _normal_appearance(annot:Annotation) -> Optional[Stream]:
+    ap = annot.obj.get(Name.AP)
+    if ap is None:
+        return None
+    normal = ap.get(Name.N)
+    if not isinstance(normal, Stream):
+        return None
+    return normal
+
+
+def _set_normal_appearance(annot:Annotation, xobj:Stream):
+    if Name.AP in annot.obj:
+        annot.obj.AP.N = xobj
+    else:
+        annot.obj.AP = Dictionary(N=xobj)
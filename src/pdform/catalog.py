@@ -0,0 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+from pikepdf import AccessMode, Pdf
+from pikepdf.form import Form
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from .describe import compile_filters
+from .schema import field_info
+import click
+import json
+import os
+
+# Bump this whenever the format of the catalog changes, so old catalogs are rebuilt
+CATALOG_VERSION = 1
+CATALOG_FILE_NAME = '.pdform-catalog.json'
+
+
+@click.command('index', help='Build or update a catalog of the fields in every PDF in a directory, for use with the search command')
+@click.argument('directory', type=click.Path(True, file_okay=False), default='.')
+@click.option('--catalog', 'catalog_path', type=click.Path(dir_okay=False), help=f'Where to save the catalog. Defaults to {CATALOG_FILE_NAME} in the directory.')
+@click.option('--jobs', '-j', type=click.IntRange(1), help='The number of worker processes to use. Defaults to the number of CPUs.')
+def index_cli(directory, catalog_path, jobs):
+    if catalog_path is None:
+        catalog_path = Path(directory) / CATALOG_FILE_NAME
+    catalog = load_catalog(catalog_path)
+    for path, error in update_catalog(catalog, directory, jobs=jobs):
+        click.secho(f"{path}: {error}", fg='yellow', err=True)
+    save_catalog(catalog_path, catalog)
+    click.echo(f"{len(catalog['templates'])} templates, {sum(len(template['fields']) for template in catalog['templates'].values())} fields")
+
+
+@click.command('search', help='Find fields in the templates catalogued by the index command, without opening the PDFs')
+@click.argument('directory', type=click.Path(True, file_okay=False), default='.')
+@click.option('--catalog', 'catalog_path', type=click.Path(True, dir_okay=False), help=f'The catalog to search. Defaults to {CATALOG_FILE_NAME} in the directory.')
+@click.option('--text', 'filter_types', help='Show text fields. (If no type filters are provided, all will be implied true)', multiple=True, flag_value='text')
+@click.option('--checkbox', 'filter_types', help='Show checkbox fields. (If no type filters are provided, all will be implied true)', multiple=True, flag_value='checkbox')
+@click.option('--radio', 'filter_types', help='Show radio fields. (If no type filters are provided, all will be implied true)', multiple=True, flag_value='radio')
+@click.option('--choice', 'filter_types', help='Show choice fields. (If no type filters are provided, all will be implied true)', multiple=True, flag_value='choice')
+@click.option('--signature', 'filter_types', help='Show signature fields. (If no type filters are provided, all will be implied true)', multiple=True, flag_value='signature')
+@click.option('--name', '-n', 'filter_name', help='Show only fields with a name containing the given string. Use slashes to build a regex.', multiple=True, type=click.STRING)
+@click.option('--label', '-l', 'filter_label', help='Show only fields with a label containing the given string. Use slashes to build a regex.', multiple=True, type=click.STRING)
+@click.option('--option', '-o', 'filter_option', help='Show only fields with an option containing the given string. Use slashes to build a regex.', multiple=True, type=click.STRING)
+@click.option('--template', '-t', 'filter_template', help='Show only fields in templates with a path containing the given string. Use slashes to build a regex.', multiple=True, type=click.STRING)
+@click.option('--json', 'as_json', help='Output one JSON object per matching field.', is_flag=True)
+def search_cli(directory, catalog_path, filter_types, filter_name, filter_label, filter_option, filter_template, as_json):
+    if catalog_path is None:
+        catalog_path = Path(directory) / CATALOG_FILE_NAME
+        if not catalog_path.exists():
+            raise click.UsageError(f"No catalog found at {catalog_path}. Run the index command first.")
+    catalog = load_catalog(catalog_path)
+    something_shown = False
+    for entry in search(catalog, types=filter_types, name=filter_name, label=filter_label, option=filter_option, template=filter_template):
+        something_shown = True
+        if as_json:
+            click.echo(json.dumps(entry._asdict()))
+        else:
+            click.echo(f"{entry.template}:{entry.page}\t{entry.name}\t{entry.type}\t{entry.label}")
+    if not something_shown and not as_json:
+        click.secho("No fields match the given criteria.", fg='yellow', err=True)
+
+
+class CatalogEntry(NamedTuple):
+    template: str
+    """The path of the template, relative to the catalogued directory"""
+    page: Optional[int]
+    """The (1-based) number of the first page the field appears on, or None if it has no widgets"""
+    name: str
+    label: str
+    type: Optional[str]
+    """The field type, as used by :func:`pdform.schema.make_schema`"""
+    options: List[str]
+
+
+def load_catalog(path:Union[str,Path]) -> dict:
+    """Load a catalog saved by :func:`save_catalog`, or return an empty catalog if there is none."""
+    try:
+        with open(path, 'r') as file:
+            catalog = json.load(file)
+    except FileNotFoundError:
+        catalog = None
+    if catalog is None or catalog.get('version') != CATALOG_VERSION:
+        catalog = {'version': CATALOG_VERSION, 'templates': {}}
+    return catalog
+
+
+def save_catalog(path:Union[str,Path], catalog:dict):
+    # Write to a temporary file first, so an interrupted run doesn't lose the whole catalog
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(catalog, file, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def update_catalog(catalog:dict, directory:Union[str,Path], *, jobs:Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Bring a catalog up to date with the PDFs in a directory (and its subdirectories).
+
+    Templates whose size and modification time are unchanged are skipped without being read.
+    Templates which have been touched but have the same content are only hashed. Everything else is
+    opened and its fields catalogued again, and templates which no longer exist are removed.
+
+    :param catalog: A catalog, as returned by :func:`load_catalog`. It is updated in place.
+    :param directory: The directory of templates
+    :param jobs: The number of worker processes to use. Defaults to the number of CPUs. If 1, no
+        worker processes are started.
+    :return: An iterator of ``(path, error)`` tuples for any templates that could not be read. It
+        must be consumed for the catalog to be updated.
+    """
+    directory = Path(directory)
+    templates = catalog['templates']
+    found = set()
+    stale = []
+    for path in sorted(directory.rglob('*.pdf')):
+        if not path.is_file():
+            continue
+        relpath = path.relative_to(directory).as_posix()
+        found.add(relpath)
+        stat = path.stat()
+        template = templates.get(relpath)
+        if template is not None and template['mtime'] == stat.st_mtime_ns and template['size'] == stat.st_size:
+            continue
+        stale.append((relpath, str(path), stat, None if template is None else template['sha256']))
+    for relpath in list(templates):
+        if relpath not in found:
+            del templates[relpath]
+    results = _index_files([(path, digest) for _, path, _, digest in stale], jobs=jobs)
+    for (relpath, _, stat, _), (digest, fields, error) in zip(stale, results):
+        if error is not None:
+            templates.pop(relpath, None)
+            yield relpath, error
+            continue
+        templates[relpath] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'fields': fields if fields is not None else templates[relpath]['fields'],
+        }
+
+
+def _index_files(files:List[Tuple[str, Optional[str]]], *, jobs:Optional[int]):
+    if jobs == 1 or len(files) <= 1:
+        yield from (_index_file(*file) for file in files)
+        return
+    with ProcessPoolExecutor(jobs) as executor:
+        yield from executor.map(_index_file, *zip(*files), chunksize=16)
+
+
+def _index_file(path:str, previous_digest:Optional[str]):
+    try:
+        hasher = sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        if digest == previous_digest:
+            # Only the modification time changed
+            return digest, None, None
+        with Pdf.open(path, access_mode=AccessMode.mmap) as pdf:
+            return digest, catalog_fields(pdf), None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def catalog_fields(pdf:Pdf) -> List[list]:
+    """
+    List the fields of a form, with the details stored in the catalog. Each field is a list of the
+    page, name, label, type, and options.
+    """
+    form = Form(pdf)
+    if not form.exists:
+        return []
+    pages = {}
+    for page_no, page in enumerate(pdf.pages, 1):
+        for widget in form.get_widget_annotations_for_page(page):
+            pages.setdefault(form.get_field_for_annotation(widget).fully_qualified_name, page_no)
+    fields = []
+    for name, field in form.items():
+        if not name:
+            continue
+        info = field_info(field)
+        # Stored as a list in the same order as CatalogEntry, which is much quicker to load than an
+        # object for each field
+        fields.append([pages.get(name), name, field.alternate_name, info.get('type'), info.get('options', [])])
+    return fields
+
+def search(catalog:dict, *, types:Iterable[str] = (), name:Iterable[str] = (), label:Iterable[str] = (), option:Iterable[str] = (), template:Iterable[str] = ()) -> Iterator[CatalogEntry]:
+    """
+    Find fields in a catalog. Each filter is a list of strings in the same format as the ``describe``
+    command's filters: a case-insensitive substring, or a regular expression wrapped in slashes. A
+    field must match at least one string of every filter given.
+
+    :param types: Field types to include, as used by :func:`pdform.schema.make_schema`. If empty,
+        all types are included.
+    """
+    types = frozenset(types)
+    name, label, option, template = tuple(name), tuple(label), tuple(option), tuple(template)
+    name_matches = compile_filters(name)
+    label_matches = compile_filters(label)
+    option_matches = compile_filters(option)
+    template_matches = compile_filters(template)
+    for path, entry in catalog['templates'].items():
+        if template and not template_matches(path):
+            continue
+        for page, field_name, field_label, field_type, field_options in entry['fields']:
+            if types and field_type not in types:
+                continue
+            if name and not name_matches(field_name):
+                continue
+            if label and not label_matches(field_label):
+                continue
+            if option and not any(map(option_matches, field_options)):
+                continue
+            yield CatalogEntry(path, page, field_name, field_label, field_type, field_options)
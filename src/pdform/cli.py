@@ -2,6 +2,9 @@ import click
 from .make_html.cli import cli as make_html
 from .describe import describe
 from .fill_form import cli as fill_form
+from .schema import cli as schema
+from .extract import cli as extract
+from .catalog import index_cli as index, search_cli as search
 
 @click.group()
 def cli():
@@ -9,4 +12,8 @@ def cli():
 
 cli.add_command(make_html)
 cli.add_command(describe)
-cli.add_command(fill_form)
\ No newline at end of file
+cli.add_command(fill_form)
+cli.add_command(schema)
+cli.add_command(extract)
+cli.add_command(index)
+cli.add_command(search)
\ No newline at end of file
@@ -33,6 +33,8 @@ def describe(path, filter_types, filter_name, filter_label, names_only):
             return
 
 
+        name_matches = compile_filters(filter_name)
+        label_matches = compile_filters(filter_label)
         for name, field in form.items():
             if filter_types:
                 if isinstance(field, TextField) and 'text' not in filter_types:
@@ -46,9 +48,9 @@ def describe(path, filter_types, filter_name, filter_label, names_only):
                 if isinstance(field, SignatureField) and 'signature' not in filter_types:
                     continue
             
-            if filter_name and not filter_match(filter_name, name):
+            if filter_name and not name_matches(name):
                 continue
-            if filter_label and not filter_match(filter_label, field.alternate_name):
+            if filter_label and not label_matches(field.alternate_name):
                 continue
 
             something_shown = True
@@ -109,15 +111,26 @@ def describe(path, filter_types, filter_name, filter_label, names_only):
         click.secho("No fields match the given criteria.", fg='yellow')
             
 
-def filter_match(filters, match_against):
-    matched = False
-    for fl in filters:
-        if fl.startswith('/') and fl.endswith('/'):
-            if re.search(fl[1:-2], match_against):
-                matched = True
-        elif fl.lower() in match_against.lower():
-            matched = True
-    return matched
+def compile_filters(filters):
+    """
+    Compile ``--name`` or ``--label`` style filters into a function that checks if a string matches
+    any of them. Filters wrapped in slashes are regular expressions, anything else is a
+    case-insensitive substring.
+    """
+    patterns = [
+        re.compile(fl[1:-1]) if len(fl) > 1 and fl.startswith('/') and fl.endswith('/') else re.compile(re.escape(fl), re.IGNORECASE)
+        for fl in filters
+    ]
+    if len(patterns) == 1:
+        # By far the most common case, and searching many fields is quicker without the wrapper
+        return patterns[0].search
+    def matches(match_against):
+        return any(pattern.search(match_against) for pattern in patterns)
+    return matches
+
+
+def filter_match(filters, match_against) -> bool:
+    return bool(compile_filters(filters)(match_against))
 
 
 if __name__ == '__main__':
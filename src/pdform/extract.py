@@ -0,0 +1,145 @@
+from concurrent.futures import ProcessPoolExecutor
+from pikepdf import AccessMode, Array, Dictionary, Name, Pdf, String
+from typing import Iterable, Iterator, Optional, Tuple
+import click
+import csv
+import json
+
+
+@click.command('extract', help='Read the field values out of filled PDFs, one row per document')
+@click.argument('paths', type=click.Path(True, dir_okay=False), nargs=-1, required=True)
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Where to write the extracted rows.')
+@click.option('--jsonl', 'output_format', help='Output one JSON object per line (the default)', flag_value='jsonl', default=True)
+@click.option('--csv', 'output_format', help='Output CSV, with a column for each field', flag_value='csv')
+@click.option('--schema', 'schema_file', type=click.File(), help='Use the fields in this schema (as created by the schema command) as the CSV columns, rather than those of the first document.')
+@click.option('--jobs', '-j', type=click.IntRange(1), help='The number of worker processes to use. Defaults to the number of CPUs.')
+def cli(paths, output, output_format, schema_file, jobs):
+    rows = extract_files(paths, jobs=jobs)
+    dropped = 0
+    if output_format == 'jsonl':
+        write = lambda values: output.write(json.dumps(values) + '\n')
+    else:
+        writer = None
+        known = None
+        def write(values):
+            nonlocal writer, known, dropped
+            if writer is None:
+                if schema_file is not None:
+                    columns = list(json.load(schema_file)['fields'])
+                else:
+                    columns = [key for key in values if key != '.file']
+                writer = csv.DictWriter(output, ['.file', *columns], extrasaction='ignore')
+                writer.writeheader()
+                known = set(writer.fieldnames)
+            # Documents from other revisions of the template may have fields with no column
+            extra = [key for key in values if key not in known]
+            if extra:
+                dropped += 1
+                click.secho(f"{values['.file']}: no column for {', '.join(extra)}, so these values were not written", fg='red', err=True)
+            writer.writerow({
+                key: json.dumps(value) if isinstance(value, list) else value
+                for key, value in values.items()
+            })
+    for path, values, error in rows:
+        if error is not None:
+            click.secho(f"{path}: {error}", fg='yellow', err=True)
+            continue
+        write({'.file': path, **values})
+    if dropped:
+        hint = '' if schema_file is not None else ' Use --schema to choose the columns, or --jsonl to keep every field.'
+        click.secho(f"Some values were left out of {dropped} documents.{hint}", fg='red', err=True)
+        raise click.exceptions.Exit(1)
+
+
+def extract_files(paths:Iterable[str], *, jobs:Optional[int] = None) -> Iterator[Tuple[str, Optional[dict], Optional[str]]]:
+    """
+    Extract the field values from many PDFs in parallel.
+
+    :param paths: The files to read
+    :param jobs: The number of worker processes to use. Defaults to the number of CPUs. If 1, no
+        worker processes are started.
+    :return: An iterator of ``(path, values, error)`` tuples, in the same order as the paths. If a
+        file could not be read, values will be None and error will describe why.
+    """
+    if jobs == 1:
+        yield from map(_extract_file, paths)
+        return
+    with ProcessPoolExecutor(jobs) as executor:
+        yield from executor.map(_extract_file, paths, chunksize=16)
+
+
+def _extract_file(path:str):
+    try:
+        # Much quicker to open than reading through a Python file object
+        with Pdf.open(path, access_mode=AccessMode.mmap) as pdf:
+            return path, extract_values(pdf), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def extract_values(pdf:Pdf) -> dict:
+    """
+    Read the values of all the fields in a form, in the same format accepted by
+    :func:`pdform.fill_form.fill_form`.
+
+    Only the field dictionaries reachable from the AcroForm are read; pages, annotations, and
+    appearance streams are never loaded. Push buttons and signatures have no value, so are omitted.
+    """
+    acroform = pdf.Root.get(Name.AcroForm)
+    if acroform is None:
+        return {}
+    values = {}
+    seen = set()
+    for field in acroform.get(Name.Fields, Array()):
+        _extract_field(field, None, None, 0, None, values, seen)
+    return values
+
+
+_FF_RADIO = 1 << 15
+_FF_PUSHBUTTON = 1 << 16
+
+
+def _extract_field(field:Dictionary, parent_name, field_type, flags, value, values:dict, seen:set):
+    if not isinstance(field, Dictionary) or field.objgen in seen:
+        return
+    if field.is_indirect:
+        seen.add(field.objgen)
+    partial_name = field.get(Name.T)
+    if partial_name is None:
+        name = parent_name
+    elif parent_name is None:
+        name = str(partial_name)
+    else:
+        name = f"{parent_name}.{partial_name}"
+    # These are inheritable from parent fields
+    field_type = field.get(Name.FT, field_type)
+    flags = int(field.get(Name.Ff, flags))
+    value = field.get(Name.V, value)
+    kids = [kid for kid in field.get(Name.Kids, Array()) if isinstance(kid, Dictionary) and Name.T in kid]
+    if kids:
+        for kid in kids:
+            _extract_field(kid, name, field_type, flags, value, values, seen)
+        return
+    if not name or name in values:
+        return
+    if field_type == Name.Btn:
+        if flags & _FF_PUSHBUTTON:
+            return
+        if flags & _FF_RADIO:
+            values[name] = None if value is None or value == Name.Off else str(value)[1:]
+        else:
+            values[name] = value is not None and value != Name.Off
+    elif field_type in (Name.Tx, Name.Ch):
+        values[name] = _decode_value(value)
+
+
+def _decode_value(value):
+    if value is None:
+        return None
+    if isinstance(value, Array):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, Name):
+        return str(value)[1:]
+    if isinstance(value, String):
+        return str(value)
+    return str(value)
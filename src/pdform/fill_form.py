@@ -1,24 +1,64 @@
 from io import BytesIO
-from pikepdf import Name, Pdf, Page, Rectangle
-from pikepdf.form import Form, TextField, CheckboxField, RadioButtonGroup, ChoiceField, SignatureField, ExtendedAppearanceStreamGenerator
+from pikepdf import AccessMode, AcroForm, AcroFormField, Annotation, Dictionary, Name, Pdf, Page, Rectangle
+from pikepdf.form import Form, TextField, CheckboxField, RadioButtonGroup, ChoiceField, SignatureField
 from PIL import Image
+from functools import partial
+from typing import Iterable, Iterator, List, Optional
+from .appearance import AppearanceStreamCache, CachingAppearanceStreamGenerator
+from .schema import make_schema, validate
 import click
 
 
 @click.command('fill-form', help='Populate the template with the provided data')
-@click.argument('template', type=click.File(), required=True)
-@click.argument('output', type=click.File('w'), required=True)
-@click.argument('data-file', type=click.File(), default='-')
+@click.argument('template', type=click.Path(True, dir_okay=False), required=True)
+@click.argument('output', type=click.Path(dir_okay=False, allow_dash=True), required=False)
+@click.argument('data-file', type=click.Path(dir_okay=False, allow_dash=True), required=False)
 @click.option('--data-format', help='The format of the data file.', type=click.Choice(('json',)), default='json')
 @click.option('--set', '-s', 'cli_data', nargs=2, multiple=True, help='Set a field value in the form. Using this option causes the data file to be ignored.')
-def cli(template, output, data_file, data_format, cli_data):
+@click.option('--merge', is_flag=True, help='Treat the data file as a list of records, and fill a copy of the template for each one, all merged into a single output document.')
+@click.option('--validate-only', is_flag=True, help='Only check the data against the fields in the template, without filling it. The OUTPUT argument may be left out, in which case the second argument is the data file.')
+@click.option('--schema', 'schema_file', type=click.File(), help='Validate against this schema (as created by the schema command) rather than reading the fields from the template. Requires --validate-only.')
+def cli(template, output, data_file, data_format, cli_data, merge, validate_only, schema_file):
+    if schema_file is not None and not validate_only:
+        raise click.UsageError('--schema can only be used together with --validate-only')
+    if validate_only:
+        if data_file is None:
+            # Nothing is written, so the output can be left out
+            output, data_file = None, output
+    elif output is None:
+        raise click.UsageError("Missing argument 'OUTPUT'.")
     if cli_data:
+        if merge:
+            raise click.UsageError('--set cannot be used together with --merge')
         data = dict(cli_data)
     else:
-        data = parse_data(data_format, data_file)
-    with Pdf.open(template) as pdf:
-        fill_form(pdf, data)
-        pdf.save(output)
+        with click.open_file(data_file or '-') as file:
+            data = parse_data(data_format, file)
+    if merge and not isinstance(data, list):
+        raise click.BadParameter('must contain a list of records when using --merge', param_hint='data-file')
+    if validate_only:
+        if schema_file is not None:
+            from json import load
+            schema = load(schema_file)
+        else:
+            with Pdf.open(template, access_mode=AccessMode.mmap) as pdf:
+                schema = make_schema(pdf)
+        issues = validate(data, schema)
+        for issue in issues:
+            click.secho(str(issue), fg='red', err=True)
+        if issues:
+            raise click.exceptions.Exit(1)
+        click.secho('Data is valid.', fg='green', err=True)
+        return
+    # With memory-mapping, the template's bytes are read straight from the OS page cache, which is
+    # shared by every process filling the same template
+    with Pdf.open(template, access_mode=AccessMode.mmap) as pdf:
+        if merge:
+            fill_merged(pdf, data)
+        else:
+            fill_form(pdf, data)
+        with click.open_file(output, 'wb') as file:
+            pdf.save(file)
 
 
 def parse_data(format, file):
@@ -63,7 +103,7 @@ def stamp(img, page:Page, rect:Rectangle):
         page.add_overlay(stamp_pdf.pages[0], rect)
 
 
-def fill_form(pdf:Pdf, data:dict):
+def fill_form(pdf:Pdf, data:dict, *, appearance_cache:Optional[AppearanceStreamCache]=None):
     """
     Fill the form fields of the given PDF with the data provided.
 
@@ -72,42 +112,228 @@ def fill_form(pdf:Pdf, data:dict):
         the field's fully-qualified name. The values should be as follows:
 
         * For text fields, provide the value to set
-        * For checkboxes, provide a boolean
+        * For checkboxes, provide a boolean, or the name of one of the checkbox's states
         * For radio buttons, provide the value in the button's AP.N dictionary
         * For signature fields, provide the path to an image which will be stamped in its place
           (real cryptographic signatures are not supported)
+    :param appearance_cache: Generated appearance streams will be reused from this cache. Pass
+        the same cache when filling many documents to share appearances between them.
     """
     # Populate form
-    form = Form(pdf, ExtendedAppearanceStreamGenerator)
+    form = Form(pdf, partial(CachingAppearanceStreamGenerator, cache=appearance_cache))
     for key, field in form.items():
         if key and key in data and data[key] is not None:
-            value = data[key]
-            if isinstance(field, (TextField, ChoiceField)):
-                field.value = value
-            elif isinstance(field, CheckboxField):
-                if value is True:
-                    field.checked = True
-                elif value is None or value is False:
-                    field.checked = False
-                else:
-                    field.value = to_name(value)
-            elif isinstance(field, RadioButtonGroup):
-                field.value = to_name(value)
-            elif isinstance(field, SignatureField):
-                if isinstance(value, str):
-                    img = value
-                    expand = None
-                else:
-                    img = value['img']
-                    expand = value.get('expand_rect')
-                with img_to_pdf(img) as stamp_pdf:
-                    field.stamp_overlay(stamp_pdf.pages[0], expand_rect=expand)
+            fill_field(field, data[key])
     if '.stamps' in data:
-        # Custom stamps not associated with fields
-        for stamp_data in data['.stamps']:
-            if not stamp_data['img']:
+        stamp_pages(pdf.pages, data['.stamps'])
+
+
+def fill_merged(pdf:Pdf, records:Iterable[dict], *, appearance_cache:Optional[AppearanceStreamCache]=None):
+    """
+    Fill a separate copy of the form for each record, all within the same document.
+
+    The existing pages of the PDF are used as the template. The first record is filled in place,
+    and a copy of the template pages is appended for each subsequent record. Page content streams,
+    resources (fonts, images, etc...), and the appearance streams of unchanged widgets are shared
+    by all the copies rather than being duplicated, so the output stays small.
+
+    To avoid collisions, the top-level name of each field is suffixed with the (1-based) record
+    number. For example, ``address.city`` becomes ``address_3.city`` for the third record.
+
+    :param pdf: The PDF to use as the template, which will also receive the filled copies
+    :param records: The data for each copy, in the same format accepted by :func:`fill_form`
+    :param appearance_cache: Generated appearance streams will be reused from this cache
+    """
+    form = Form(pdf, partial(CachingAppearanceStreamGenerator, cache=appearance_cache))
+    template_pages = list(pdf.pages)
+    # A separate helper for looking up the template's fields, which are left as they are until the
+    # end, so it never needs to see the copies
+    template_acroform = pdf.acroform
+    # Rename the template's fields before copying anything. Otherwise a new name could clash with one
+    # of the template's own fields which hasn't been renamed yet (e.g. ``Date`` of the second record
+    # becoming ``Date_2`` while the template still has a ``Date_2``). Once every field has its final
+    # name there can be no clashes, since the suffix after the last underscore is always the record
+    # number.
+    original_names = _top_level_names(form, template_pages)
+    _rename_fields(form, template_pages, template_pages, original_names, 1)
+    first_record = None
+    for index, data in enumerate(records, 1):
+        if index == 1:
+            # Filled last, so the template's values remain pristine while we copy it
+            first_record = data
+            continue
+        pages = []
+        copies = {}
+        for template_page in template_pages:
+            pdf.pages.append(template_page)
+            page = pdf.pages[-1]
+            _copy_page_fields(form, template_acroform, template_page, page, copies)
+            pages.append(page)
+        _rename_fields(form, template_pages, pages, original_names, index)
+        _fill_record(form, pages, data, index)
+    if first_record is not None:
+        _fill_record(form, template_pages, first_record, 1)
+
+
+def _copy_page_fields(form:Form, template_acroform:AcroForm, template_page:Page, page:Page, copies:dict):
+    """
+    Give a page duplicated from the template its own copies of the template's annotations and
+    fields.
+
+    :param copies: The fields copied for this record so far, keyed by the objgen of the original.
+        The same dict must be used for every page of the record.
+    """
+    form.fix_copied_annotations(page, template_page, template_acroform)
+    duplicates = {}
+    # The copied annotations are in the same order as the originals
+    for original, copy in zip(template_page.obj.get(Name.Annots, ()), page.obj.get(Name.Annots, ())):
+        if Name.AP in original and _inherited_type(copy) not in (Name.Tx, Name.Ch):
+            # Share the original appearance streams rather than keeping duplicates. Only the
+            # dictionaries are copied, since filling the field replaces their entries. (Text and
+            # choice appearances may be rewritten in place when filled, so can't be shared.)
+            copy.AP = Dictionary({
+                key: Dictionary(dict(value.items())) if isinstance(value, Dictionary) else value
+                for key, value in original.AP.items()
+            })
+        # Each page copied gets its own clone of the whole tree of every field on it, so a field
+        # with widgets on several pages (e.g. form1[0].page0[0] and form1[0].page1[0]) would be
+        # cloned once per page. Keep the first clone of each field, and move the widgets to it.
+        child_original, child_copy = original, copy
+        while isinstance(child_original.get(Name.Parent), Dictionary):
+            parent_original, parent_copy = child_original.Parent, child_copy.Parent
+            kept = copies.setdefault(parent_original.objgen, parent_copy)
+            if kept.objgen != parent_copy.objgen:
+                kept.Kids[_index_of(parent_original.Kids, child_original)] = child_copy
+                child_copy.Parent = kept
+                root = _root_field(parent_copy)
+                duplicates[root.objgen] = root
+                break
+            child_original, child_copy = parent_original, parent_copy
+    if duplicates:
+        # Whatever is left of the extra clones isn't on any page
+        form.remove_fields([
+            AcroFormField(field) for root in duplicates.values() for field in _field_tree(root)
+        ])
+
+
+def _top_level_names(form:Form, pages:List[Page]) -> dict:
+    """Get the names of the top-level fields on the pages, keyed by objgen."""
+    names = {}
+    for page in pages:
+        for widget in form.get_widget_annotations_for_page(page):
+            field = form.get_field_for_annotation(widget)
+            if not field.is_null:
+                field = field.top_level_field
+                names.setdefault(field.obj.objgen, field.partial_name)
+    return names
+
+
+def _rename_fields(form:Form, template_pages:List[Page], pages:List[Page], original_names:dict, index:int):
+    """
+    Suffix the top-level name of every field on a copy of the template with the record number.
+
+    :param original_names: The names of the template's top-level fields, as returned by
+        :func:`_top_level_names` before any were renamed
+    """
+    renamed = set()
+    for template_page, page in zip(template_pages, pages):
+        # The copied annotations are in the same order as the originals
+        for original, copy in zip(template_page.obj.get(Name.Annots, ()), page.obj.get(Name.Annots, ())):
+            field = form.get_field_for_annotation(Annotation(copy))
+            if field.is_null:
                 continue
-            stamp(stamp_data['img'], pdf.pages[stamp_data['page']-1], Rectangle(*stamp_data['rect']))
+            field = field.top_level_field
+            if field.obj.objgen in renamed:
+                continue
+            renamed.add(field.obj.objgen)
+            original_field = form.get_field_for_annotation(Annotation(original)).top_level_field
+            form.set_field_name(field, f"{original_names[original_field.obj.objgen]}_{index}")
+
+
+def _root_field(field:Dictionary) -> Dictionary:
+    while isinstance(field.get(Name.Parent), Dictionary):
+        field = field.Parent
+    return field
+
+
+def _field_tree(field:Dictionary) -> Iterator[Dictionary]:
+    yield field
+    for kid in field.get(Name.Kids, ()):
+        if isinstance(kid, Dictionary):
+            yield from _field_tree(kid)
+
+
+def _index_of(array, obj:Dictionary) -> int:
+    for i, item in enumerate(array):
+        if item.objgen == obj.objgen:
+            return i
+    raise ValueError('Field is not a kid of its parent')
+
+
+def _inherited_type(field:Dictionary):
+    while field is not None and Name.FT not in field:
+        field = field.get(Name.Parent)
+    return None if field is None else field.FT
+
+
+def _fill_record(form:Form, pages:List[Page], data:dict, index:int):
+    for key, value in data.items():
+        if not key or key == '.stamps' or value is None:
+            continue
+        head, sep, tail = key.partition('.')
+        try:
+            field = form[f"{head}_{index}{sep}{tail}"]
+        except KeyError:
+            continue
+        fill_field(field, value)
+    if '.stamps' in data:
+        stamp_pages(pages, data['.stamps'])
+
+
+def fill_field(field, value):
+    """
+    Set the value of a single form field.
+
+    :param field: The field to populate, as returned by :class:`pikepdf.form.Form`
+    :param value: The value to set, in the same format accepted by :func:`fill_form`
+    """
+    if isinstance(field, (TextField, ChoiceField)):
+        field.value = value
+    elif isinstance(field, CheckboxField):
+        if value is True:
+            field.checked = True
+        elif value is None or value is False:
+            field.checked = False
+        else:
+            state = to_name(value)
+            if state not in field.states:
+                raise ValueError(f"{value!r} is not one of the checkbox's states")
+            # The wrapper only lets us check or uncheck, so set the state on the field itself
+            field._field.set_value(state)
+    elif isinstance(field, RadioButtonGroup):
+        field.value = to_name(value)
+    elif isinstance(field, SignatureField):
+        if isinstance(value, str):
+            img = value
+            expand = None
+        else:
+            img = value['img']
+            expand = value.get('expand_rect')
+        with img_to_pdf(img) as stamp_pdf:
+            field.stamp_overlay(stamp_pdf.pages[0], expand_rect=expand)
+
+
+def stamp_pages(pages, stamps:List[dict]):
+    """
+    Apply custom stamps which are not associated with any field.
+
+    :param pages: The pages the stamps' (1-based) page numbers refer to
+    :param stamps: A list of dictionaries, each with an ``img``, ``page``, and ``rect``
+    """
+    for stamp_data in stamps:
+        if not stamp_data['img']:
+            continue
+        stamp(stamp_data['img'], pages[stamp_data['page']-1], Rectangle(*stamp_data['rect']))
 
 
 def to_name(value: str):
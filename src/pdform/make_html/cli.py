@@ -1,4 +1,6 @@
 import click
+import os
+from pathlib import Path
 from .make_html import make_html
 from .field_renderer import FieldRenderer, PHPFieldRenderer, JinjaFieldRenderer
 
@@ -15,7 +17,12 @@ from .field_renderer import FieldRenderer, PHPFieldRenderer, JinjaFieldRenderer
 @click.option('--html', 'field_renderer_class', help='Render the page as plain HTML', flag_value='html', default=True)
 @click.option('--php', 'field_renderer_class', help='Render the page as PHP code', flag_value='php')
 @click.option('--jinja', 'field_renderer_class', help='Render the page as a Jinja template', flag_value='jinja')
+@click.option('--assets-dir', help='Write fonts, page backgrounds, and stylesheets to this directory as separate, content-hashed files, rather than inlining them', type=click.Path(file_okay=False))
+@click.option('--assets-url', help='The URL the assets directory will be served from. Defaults to its path relative to the output file.')
+@click.option('--cache-dir', help='Save each generated page in this directory, and only convert pages which have changed since the last run', type=click.Path(file_okay=False))
 def cli(path, output, *, field_renderer_class, **kwargs):
+    if kwargs['assets_dir'] is not None and kwargs['assets_url'] is None and output.name != '-' and not output.name.startswith('<'):
+        kwargs['assets_url'] = Path(os.path.relpath(kwargs['assets_dir'], os.path.dirname(os.path.abspath(output.name)))).as_posix()
     kwargs['field_renderer_class'] = {
         'html':FieldRenderer,
         'php':PHPFieldRenderer,
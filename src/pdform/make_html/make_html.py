@@ -4,16 +4,149 @@ from .template_soup import TemplateSoup
 from bs4 import Tag, BeautifulSoup
 import tempfile
 from .process_form import add_form_fields
+from .page_cache import PageCache, options_key, page_key, scope_css
 from pathlib import Path
-from pikepdf import Pdf
+from pikepdf import AccessMode, Pdf
 from pikepdf.form import Form
 import re
-from base64 import urlsafe_b64decode
+from base64 import b64decode, urlsafe_b64decode
+from hashlib import sha256
 from io import StringIO
+from mimetypes import guess_extension
 from typing import Optional, Union
+from urllib.parse import unquote_to_bytes
 
 
-def make_html(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int,float]=1, from_page:Optional[int]=None, to_page:Optional[int]=None, **process_form_args):
+def make_html(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int,float]=1, from_page:Optional[int]=None, to_page:Optional[int]=None, assets_dir:Union[str,Path,None]=None, assets_url:Optional[str]=None, cache_dir:Union[str,Path,None]=None, **process_form_args):
+    """
+    :param assets_dir: If provided, fonts, page backgrounds, and stylesheets will be written to this
+        directory as separate files, named by a hash of their content, rather than being inlined in
+        the HTML. This allows them to be cached by browsers and shared between forms.
+    :param assets_url: The URL at which the assets directory will be served. Defaults to the path of
+        the assets directory as given.
+    :param cache_dir: If provided, the output of pdf2htmlEX for each page is saved in this
+        directory, keyed by a hash of the page. When the HTML is regenerated for a revised PDF,
+        pdf2htmlEX is only run again for the pages which have changed. The form fields are added to
+        every page as usual, so the result can be post-processed in the same way. (Each page is
+        wrapped in a ``div`` with ``display:contents``, to which the page's styles are scoped.)
+    """
+    if assets_dir is not None:
+        assets_dir = Path(assets_dir)
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        if assets_url is None:
+            assets_url = assets_dir.as_posix()
+        assets_url = assets_url.rstrip('/') + '/'
+
+    with Pdf.open(path, access_mode=AccessMode.mmap) as pdf:
+        if cache_dir is not None:
+            soup = _convert_pdf_cached(path, pdf, cache_dir,
+                pdf2html=pdf2html,
+                zoom=zoom,
+                from_page=from_page,
+                to_page=to_page,
+                assets_dir=assets_dir,
+                assets_url=assets_url,
+            )
+        else:
+            soup = convert_pdf(path,
+                pdf2html=pdf2html,
+                zoom=zoom,
+                from_page=from_page,
+                to_page=to_page,
+                assets_dir=assets_dir,
+                assets_url=assets_url,
+            )
+            # Copy any new styles we've created
+            if assets_dir is None:
+                new_styles = soup.new_tag('style')
+                new_styles.string = svg_path_styles_css()
+                soup.head.append(new_styles)
+
+        # Add our own stuff direct from the PDF
+        form = Form(pdf)
+        add_form_fields(soup, pdf, form,
+            zoom=zoom,
+            start_page=from_page or 1,
+            end_page=to_page,
+            **process_form_args
+        )
+
+    if assets_dir is not None:
+        # Now that all the styles are in place, move them out to their own files
+        for el in soup.find_all('style'):
+            css = _css_data_url_re.sub(
+                lambda match: f"url({write_asset(assets_dir, *decode_data_url(match.group(2)))})",
+                el.string or '',
+            )
+            link = soup.new_tag('link', rel='stylesheet', href=assets_url + write_asset(assets_dir, css.encode(), '.css'))
+            el.replace_with(link)
+
+    return soup
+
+
+def _convert_pdf_cached(path:Union[str,Path], pdf:Pdf, cache_dir:Union[str,Path], *, pdf2html:str, zoom:Union[int,float], from_page:Optional[int], to_page:Optional[int], assets_dir:Optional[Path], assets_url:Optional[str]) -> TemplateSoup:
+    """
+    The same as :func:`convert_pdf`, but only runs pdf2htmlEX for pages which aren't already in the
+    cache.
+    """
+    cache = PageCache(cache_dir)
+    options = options_key(pdf2html=pdf2html, zoom=zoom, assets_dir=assets_dir, assets_url=assets_url)
+    skeleton = cache.get_skeleton(options)
+    first_page = from_page or 1
+    last_page = to_page or len(pdf.pages)
+    keys = {
+        page_no: page_key(pdf, pdf.pages[page_no-1], page_no, options)
+        for page_no in range(first_page, last_page+1)
+    }
+    pages = {page_no: cache.get(key) for page_no, key in keys.items()}
+    changed = [page_no for page_no, page in pages.items() if page is None]
+    if skeleton is None and not changed:
+        # We need to convert at least one page to get the document to put them in
+        changed = [first_page]
+    for page_no in changed:
+        # Convert each page on its own, so its HTML and CSS don't depend on the other pages
+        page_soup = convert_pdf(path,
+            pdf2html=pdf2html,
+            zoom=zoom,
+            from_page=page_no,
+            to_page=page_no,
+            assets_dir=assets_dir,
+            assets_url=assets_url,
+        )
+        css = StringIO()
+        for el in page_soup.find_all('style'):
+            if '* Base CSS for pdf2htmlEX' not in (el.string or ''):
+                css.write(el.string or '')
+                el.decompose()
+        if assets_dir is None:
+            css.write(svg_path_styles_css())
+        # pdf2htmlEX numbers its classes and fonts from zero on each run, so the CSS for each page
+        # has to be restricted to that page.
+        scope = f"pg-{keys[page_no][:16]}"
+        html_page = page_soup.find(class_='pf')
+        pages[page_no] = (
+            f'<div class="{scope}" style="display:contents">{html_page}</div>',
+            scope_css(css.getvalue(), scope),
+        )
+        cache.put(keys[page_no], *pages[page_no])
+        if skeleton is None:
+            html_page.decompose()
+            skeleton = str(page_soup)
+            cache.put_skeleton(options, skeleton)
+
+    # Put the pages back together
+    soup = TemplateSoup(skeleton, 'lxml')
+    page_styles = soup.new_tag('style')
+    page_styles.string = ''.join(pages[page_no][1] for page_no in sorted(pages))
+    soup.head.append(page_styles)
+    page_container = soup.find(id='page-container')
+    for page_no in sorted(pages):
+        page_container.append(BeautifulSoup(pages[page_no][0], 'html.parser').div)
+    return soup
+
+
+def convert_pdf(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int,float]=1, from_page:Optional[int]=None, to_page:Optional[int]=None, assets_dir:Optional[Path]=None, assets_url:Optional[str]=None) -> TemplateSoup:
+    """Run pdf2htmlEX on the PDF, and strip away the parts of its output we don't need."""
     output_path = tempfile.mktemp()
     
     pdf2html_options = [
@@ -50,8 +183,13 @@ def make_html(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int
         el.decompose()
     for el in soup.find_all(class_='pi'):
         el.decompose()
-    for el in soup.find_all('img'):
-        unwrap_svg_img(el)
+    if assets_dir is not None:
+        for el in soup.find_all('img'):
+            if el.get('src', '').startswith('data:'):
+                el['src'] = assets_url + write_asset(assets_dir, *decode_data_url(el['src']))
+    else:
+        for el in soup.find_all('img'):
+            unwrap_svg_img(el)
     for el in soup.find_all('style'):
         if '* Fancy styles for pdf2htmlEX' in el.string:
             el.decompose()
@@ -63,7 +201,11 @@ def make_html(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int
             # Selection, page info (.pi), css drawings (.d), text input (.it), radio input (.ir) 
             css = re.sub('::(-moz-)?selection\{background:rgba\(127,255,255,0\.4\)\}.*', '', css)
             el.string = css
-    # Copy any new styles we've created
+    return soup
+
+
+def svg_path_styles_css() -> str:
+    """Get the CSS for the classes created by :func:`unwrap_svg_img`."""
     sio = StringIO()
     for style, css_class in svg_path_styles.items():
         sio.write('.')
@@ -71,21 +213,41 @@ def make_html(path:Union[str,Path], *, pdf2html:str='pdf2htmlex', zoom:Union[int
         sio.write('{')
         sio.write(style)
         sio.write('}\n')
-    sio.seek(0)
-    new_styles = soup.new_tag('style')
-    new_styles.string = sio.read()
-    soup.head.append(new_styles)
-    
-    # Add our own stuff direct from the PDF
-    with Pdf.open(path) as pdf:
-        form = Form(pdf)
-        add_form_fields(soup, pdf, form,
-            zoom=zoom, 
-            start_page=from_page,
-            **process_form_args
-        )
+    return sio.getvalue()
 
-    return soup
+
+_css_data_url_re = re.compile(r"""url\(\s*(['"]?)(data:[^'")]*)\1\s*\)""")
+_asset_extensions = {
+    'application/font-woff': '.woff',
+    'application/x-font-woff': '.woff',
+    'font/woff': '.woff',
+    'font/woff2': '.woff2',
+    'application/x-font-ttf': '.ttf',
+    'font/ttf': '.ttf',
+    'application/vnd.ms-opentype': '.otf',
+    'font/otf': '.otf',
+    'image/svg+xml': '.svg',
+}
+
+
+def decode_data_url(data_url:str):
+    """Decode a data URL, returning its content and an appropriate file extension."""
+    header, _, data = data_url[5:].partition(',')
+    mime_type, *params = header.split(';')
+    if 'base64' in params:
+        content = b64decode(data)
+    else:
+        content = unquote_to_bytes(data)
+    return content, _asset_extensions.get(mime_type) or guess_extension(mime_type) or ''
+
+
+def write_asset(assets_dir:Path, content:bytes, extension:str) -> str:
+    """Write a file to the assets directory, named by its hash, and return the file name."""
+    name = sha256(content).hexdigest()[:32] + extension
+    asset_path = assets_dir / name
+    if not asset_path.exists():
+        asset_path.write_bytes(content)
+    return name
 
 
 path_style_counter = 0
@@ -0,0 +1,176 @@
+from hashlib import sha256
+from pathlib import Path
+from pikepdf import Array, Dictionary, Name, Object, Page, Pdf, Stream
+from typing import Optional, Tuple, Union
+import json
+import re
+
+# Bump this whenever the format of cached pages changes
+CACHE_VERSION = 2
+
+
+class PageCache:
+    """
+    A directory of previously generated HTML pages, used by :func:`make_html` to avoid regenerating
+    pages which haven't changed.
+
+    Each page is stored as two files, named by a hash of everything used to generate it: the HTML
+    of the page as converted by pdf2htmlEX (without any form fields), and the CSS specific to that
+    page.
+    """
+    def __init__(self, cache_dir:Union[str,Path]):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key:str) -> Optional[Tuple[str, str]]:
+        """Get the HTML and CSS for a page, or None if not cached."""
+        try:
+            html = (self.cache_dir / f"{key}.html").read_text()
+            css = (self.cache_dir / f"{key}.css").read_text()
+        except FileNotFoundError:
+            return None
+        return html, css
+
+    def put(self, key:str, html:str, css:str):
+        # The CSS is written last, since its presence marks the entry as complete
+        (self.cache_dir / f"{key}.html").write_text(html)
+        (self.cache_dir / f"{key}.css").write_text(css)
+
+    def get_skeleton(self, key:str) -> Optional[str]:
+        """Get the HTML document the pages are placed into, or None if not cached."""
+        try:
+            return (self.cache_dir / f"skeleton-{key}.html").read_text()
+        except FileNotFoundError:
+            return None
+
+    def put_skeleton(self, key:str, html:str):
+        (self.cache_dir / f"skeleton-{key}.html").write_text(html)
+
+
+def options_key(**options) -> str:
+    """Hash the options used to generate the HTML, so that changing them invalidates the cache."""
+    def default(value):
+        if callable(value):
+            return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+        if isinstance(value, Path):
+            return str(value)
+        return repr(value)
+    options['cache_version'] = CACHE_VERSION
+    return sha256(json.dumps(options, sort_keys=True, default=default).encode()).hexdigest()
+
+
+def page_key(pdf:Pdf, page:Page, page_no:int, options:str) -> str:
+    """
+    Hash everything about a page that affects the generated HTML: its content streams, resources
+    (including fonts and images), size, and the widgets and fields on it.
+    """
+    hasher = sha256()
+    hasher.update(options.encode())
+    hasher.update(str(page_no).encode())
+    for key in (Name.MediaBox, Name.CropBox, Name.Rotate, Name.UserUnit):
+        if key in page.obj:
+            hasher.update(str(key).encode())
+            _hash_object(page.obj[key], hasher, set())
+    seen = set()
+    for content in (page.obj.get(Name.Contents), page.obj.get(Name.Resources)):
+        hasher.update(b'|')
+        if content is not None:
+            _hash_object(content, hasher, seen)
+    for annot in page.obj.get(Name.Annots, Array()):
+        hasher.update(b'|annot')
+        # Appearance streams are not used for the HTML, and /P and /Parent lead to the rest of the
+        # document, so we'll skip them.
+        _hash_object(annot, hasher, seen, skip=(Name.P, Name.Parent, Name.AP))
+        if annot.get(Name.Subtype) == Name.Widget:
+            # Widgets may inherit their field properties, so include all the ancestor fields
+            parent = annot.get(Name.Parent)
+            while isinstance(parent, Dictionary):
+                hasher.update(b'|parent')
+                _hash_object(parent, hasher, set(), skip=(Name.P, Name.Parent, Name.Kids, Name.AP))
+                parent = parent.get(Name.Parent)
+    # Fields may also inherit some properties from the form itself
+    if Name.AcroForm in pdf.Root:
+        hasher.update(b'|acroform')
+        _hash_object(pdf.Root.AcroForm, hasher, set(), skip=(Name.Fields,))
+    return hasher.hexdigest()
+
+
+def _hash_object(obj, hasher, seen:set, skip:tuple=()):
+    if isinstance(obj, Object) and obj.is_indirect:
+        # Already-seen objects (and reference cycles) only need to be recorded as a reference
+        if obj.objgen in seen:
+            hasher.update(b'R%d %d' % obj.objgen)
+            return
+        seen.add(obj.objgen)
+    if isinstance(obj, Stream):
+        hasher.update(b'stream')
+        _hash_object(obj.stream_dict, hasher, seen, (Name.Length,))
+        hasher.update(obj.read_raw_bytes())
+    elif isinstance(obj, Dictionary):
+        hasher.update(b'<<')
+        for key in sorted(obj.keys()):
+            if key in skip:
+                continue
+            hasher.update(key.encode())
+            _hash_object(obj[key], hasher, seen)
+        hasher.update(b'>>')
+    elif isinstance(obj, Array):
+        hasher.update(b'[')
+        for item in obj:
+            _hash_object(item, hasher, seen)
+        hasher.update(b']')
+    elif isinstance(obj, Object):
+        hasher.update(obj.unparse())
+    else:
+        hasher.update(repr(obj).encode())
+
+
+_css_comment_re = re.compile(r'/\*.*?\*/', re.DOTALL)
+_font_family_re = re.compile(r'(font-family\s*:\s*)(ff[0-9a-f]+)\b')
+
+
+def scope_css(css:str, scope:str) -> str:
+    """
+    Restrict the CSS generated by pdf2htmlEX for a single page to elements inside the given class,
+    so that the classes (and font names) generated for different pages don't conflict.
+    """
+    css = _css_comment_re.sub('', css)
+    css = _font_family_re.sub(lambda match: f"{match.group(1)}{match.group(2)}-{scope}", css)
+    return _scope_rules(css, f".{scope}")
+
+
+def _scope_rules(css:str, prefix:str) -> str:
+    out = []
+    pos = 0
+    while pos < len(css):
+        start = css.find('{', pos)
+        if start == -1:
+            out.append(css[pos:])
+            break
+        end = _matching_brace(css, start)
+        head = css[pos:start]
+        body = css[start+1:end]
+        stripped = head.strip()
+        if stripped.startswith('@media') or stripped.startswith('@supports'):
+            # Rules nested in a block
+            out.append(f"{head}{{{_scope_rules(body, prefix)}}}")
+        elif stripped.startswith('@'):
+            # @font-face, @keyframes, etc... have no selectors to scope
+            out.append(f"{head}{{{body}}}")
+        else:
+            selectors = ','.join(f"{prefix} {selector.strip()}" for selector in head.split(',') if selector.strip())
+            out.append(f"{selectors}{{{body}}}")
+        pos = end + 1
+    return ''.join(out)
+
+
+def _matching_brace(css:str, start:int) -> int:
+    depth = 0
+    for i in range(start, len(css)):
+        if css[i] == '{':
+            depth += 1
+        elif css[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(css)
@@ -3,17 +3,19 @@ from .template_soup import TemplateSoup
 from pikepdf import Pdf, Annotation
 from pikepdf.form import Form, TextField, CheckboxField, RadioButtonGroup, ChoiceField, SignatureField
 from .field_renderer import FieldRenderer
-from typing import Type, Union
+from typing import Optional, Type, Union
 from functools import cmp_to_key
 
 
-def add_form_fields(soup: TemplateSoup, pdf:Pdf, form: Form, zoom: Union[int,float] = 1, rename_fields = {}, field_labels = {}, sort_widgets=False, start_page:int=1, field_renderer_class:Type[FieldRenderer]=FieldRenderer):
+def add_form_fields(soup: TemplateSoup, pdf:Pdf, form: Form, zoom: Union[int,float] = 1, rename_fields = {}, field_labels = {}, sort_widgets=False, start_page:int=1, end_page:Optional[int]=None, field_renderer_class:Type[FieldRenderer]=FieldRenderer):
     """
     :param rename_fields: A mapping of PDF field names to desired HTML field names.
     :param field_labels: A mapping of PDF field names to human-readable labels.
     :param sort_widgets: Attempt to sort widgets according to their visual placement on the page. 
         This can be useful for PDF forms where the tab order is illogical, though some manual 
         refinement may still be needed afterward for a truly logical tab order.
+    :param start_page: The PDF page number of the first page in the HTML.
+    :param end_page: The PDF page number of the last page in the HTML, if not the last in the PDF.
     """
 
     html_form = soup.find(id='page-container').wrap(soup.new_tag('form'))
@@ -22,6 +24,7 @@ def add_form_fields(soup: TemplateSoup, pdf:Pdf, form: Form, zoom: Union[int,flo
     i = 0
     for page_no, pdf_page in enumerate(pdf.pages, 1):
         if page_no < start_page: continue
+        if end_page is not None and page_no > end_page: break
         widgets = form.get_widget_annotations_for_page(pdf_page)
         if not widgets: continue
         html_page = html_pages[page_no-start_page]
@@ -0,0 +1,176 @@
+from pikepdf import AccessMode, Pdf
+from pikepdf.form import Form, TextField, CheckboxField, RadioButtonGroup, ChoiceField, SignatureField, PushbuttonField
+from typing import Iterable, List, NamedTuple, Optional, Union
+import click
+import json
+
+
+@click.command('schema', help='Save a description of the form fields, for validating data without opening the PDF')
+@click.argument('template', type=click.Path(True, dir_okay=False), required=True)
+@click.argument('output', type=click.File('w'), default='-')
+def cli(template, output):
+    with Pdf.open(template, access_mode=AccessMode.mmap) as pdf:
+        json.dump(make_schema(pdf), output, indent=2)
+
+
+def make_schema(pdf:Pdf) -> dict:
+    """
+    Describe the fields of a form in a JSON-serializable format, which can be saved alongside the
+    template and used to validate data with :func:`validate` without opening the PDF again.
+    """
+    form = Form(pdf)
+    fields = {}
+    for name, field in form.items():
+        if not name:
+            continue
+        fields[name] = field_info(field)
+    return {
+        'pages': len(pdf.pages),
+        'fields': fields,
+    }
+
+
+def field_info(field) -> dict:
+    """Describe a single field, as it appears in the output of :func:`make_schema`."""
+    info = {
+        'required': field.is_required,
+        'read_only': field.is_read_only,
+    }
+    if isinstance(field, TextField):
+        info['type'] = 'text'
+        info['multiline'] = field.is_multiline
+        max_length = field.max_length
+        info['max_length'] = None if max_length is None else int(max_length)
+    elif isinstance(field, CheckboxField):
+        info['type'] = 'checkbox'
+        info['options'] = [str(state)[1:] for state in field.states]
+    elif isinstance(field, RadioButtonGroup):
+        info['type'] = 'radio'
+        info['options'] = [str(option.on_value)[1:] for option in field.options]
+    elif isinstance(field, ChoiceField):
+        info['type'] = 'choice'
+        info['options'] = [str(option.export_value) for option in field.options]
+        info['allow_edit'] = field.allow_edit
+    elif isinstance(field, SignatureField):
+        info['type'] = 'signature'
+    elif isinstance(field, PushbuttonField):
+        info['type'] = 'button'
+    return info
+
+
+class ValidationIssue(NamedTuple):
+    record: Optional[int]
+    """The (1-based) number of the record in a batch, or None if a single record was validated"""
+    field: str
+    message: str
+
+    def __str__(self):
+        if self.record is None:
+            return f"{self.field}: {self.message}"
+        return f"Record {self.record}, {self.field}: {self.message}"
+
+
+def validate(data:Union[dict, Iterable[dict]], schema:dict) -> List[ValidationIssue]:
+    """
+    Check data intended for :func:`pdform.fill_form.fill_form` against a form's schema, as created by
+    :func:`make_schema`.
+
+    :param data: A single record, or a list of records (as used for merged output)
+    :param schema: The schema of the template form
+    :return: A list of any problems found. An empty list means the data is valid.
+    """
+    if isinstance(data, dict):
+        records = [(None, data)]
+    else:
+        records = enumerate(data, 1)
+    fields = schema['fields']
+    # Sets are much quicker to check against for large batches
+    options = {
+        name: frozenset(info['options'])
+        for name, info in fields.items()
+        if 'options' in info
+    }
+    issues = []
+    for record_no, record in records:
+        if not isinstance(record, dict):
+            issues.append(ValidationIssue(record_no, '', 'Record is not an object'))
+            continue
+        for key, value in record.items():
+            if key == '.stamps':
+                message = _check_stamps(value, schema['pages'])
+            elif key not in fields:
+                message = 'No such field in the form'
+            elif value is None:
+                continue
+            else:
+                info = fields[key]
+                message = _checkers[info['type']](value, info, options.get(key, frozenset()))
+            if message is not None:
+                issues.append(ValidationIssue(record_no, key, message))
+    return issues
+
+
+def _check_text(value, info, options):
+    if not isinstance(value, str):
+        return f'Expected a string, got {type(value).__name__}'
+    max_length = info.get('max_length')
+    if max_length is not None and len(value) > max_length:
+        return f'Value is {len(value)} characters long, but the maximum length is {max_length}'
+
+
+def _check_checkbox(value, info, options):
+    if isinstance(value, bool):
+        return
+    if not isinstance(value, str) or _strip_name(value) not in options:
+        return f'Expected a boolean or one of the checkbox states ({", ".join(sorted(options))}), got {value!r}'
+
+
+def _check_radio(value, info, options):
+    if not isinstance(value, str) or _strip_name(value) not in options:
+        return f'Expected one of the options ({", ".join(sorted(options))}), got {value!r}'
+
+
+def _check_choice(value, info, options):
+    if not isinstance(value, str):
+        return f'Expected a string, got {type(value).__name__}'
+    if not info.get('allow_edit') and value not in options:
+        return f'Expected one of the options ({", ".join(sorted(options))}), got {value!r}'
+
+
+def _check_signature(value, info, options):
+    if isinstance(value, str):
+        return
+    if not isinstance(value, dict) or not isinstance(value.get('img'), str):
+        return 'Expected an image path or data URL, or an object with an "img" key'
+
+
+def _check_button(value, info, options):
+    return 'Push buttons cannot be filled'
+
+
+def _strip_name(value:str) -> str:
+    # The same as pdform.fill_form.to_name, which only adds a slash if there isn't one
+    return value[1:] if value.startswith('/') else value
+
+
+_checkers = {
+    'text': _check_text,
+    'checkbox': _check_checkbox,
+    'radio': _check_radio,
+    'choice': _check_choice,
+    'signature': _check_signature,
+    'button': _check_button,
+}
+
+
+def _check_stamps(stamps, pages):
+    if not isinstance(stamps, list):
+        return 'Expected a list of stamps'
+    for stamp_no, stamp in enumerate(stamps, 1):
+        if not isinstance(stamp, dict) or not {'img', 'page', 'rect'} <= stamp.keys():
+            return f'Stamp {stamp_no} must be an object with "img", "page", and "rect" keys'
+        if not isinstance(stamp['page'], int) or not 1 <= stamp['page'] <= pages:
+            return f'Stamp {stamp_no} is on page {stamp["page"]!r}, but the form has {pages} pages'
+        rect = stamp['rect']
+        if not isinstance(rect, list) or len(rect) != 4 or not all(isinstance(n, (int, float)) for n in rect):
+            return f'Stamp {stamp_no} must have a "rect" of four numbers'
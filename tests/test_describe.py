@@ -0,0 +1,32 @@
+from pdform.describe import compile_filters, filter_match
+
+
+def test_regex_filter_matches_up_to_last_character():
+    matches = compile_filters(['/^Text0$/'])
+    assert matches('Text0')
+    assert not matches('Text')
+    assert not matches('text0')
+
+
+def test_lone_slash_is_a_substring():
+    matches = compile_filters(['/'])
+    assert matches('a/b')
+    assert not matches('ab')
+
+
+def test_substring_filter_ignores_case():
+    matches = compile_filters(['date of'])
+    assert matches('Date Of Birth')
+    assert not matches('Birth date')
+
+
+def test_any_filter_can_match():
+    matches = compile_filters(['dob', '/^name/'])
+    assert matches('applicant_DOB')
+    assert matches('name_first')
+    assert not matches('first_name')
+
+
+def test_filter_match_returns_bool():
+    assert filter_match(['/Text\\d/'], 'Text0') is True
+    assert filter_match(['Text'], 'Check0') is False
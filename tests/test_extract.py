@@ -0,0 +1,87 @@
+from click.testing import CliRunner
+from pikepdf import Array, Dictionary, Name, Pdf, String
+from pdform.extract import cli as extract_cli, extract_values
+from .test_fill_form import make_flat_form, reopen
+
+
+def make_form(*fields) -> Pdf:
+    """A form with the given field dictionaries at the top level. Only the fields are needed to extract values."""
+    pdf = Pdf.new()
+    pdf.Root.AcroForm = Dictionary(Fields=Array([pdf.make_indirect(field) for field in fields]))
+    return reopen(pdf)
+
+
+def test_buttons():
+    pdf = make_form(
+        Dictionary(T=String('checked'), FT=Name.Btn, V=Name.Yes),
+        Dictionary(T=String('unchecked'), FT=Name.Btn, V=Name.Off),
+        Dictionary(T=String('never_checked'), FT=Name.Btn),
+        Dictionary(T=String('radio'), FT=Name.Btn, Ff=1 << 15, V=Name('/2')),
+        Dictionary(T=String('radio_off'), FT=Name.Btn, Ff=1 << 15, V=Name.Off),
+        Dictionary(T=String('radio_unset'), FT=Name.Btn, Ff=1 << 15),
+        Dictionary(T=String('reset'), FT=Name.Btn, Ff=1 << 16),
+    )
+    assert extract_values(pdf) == {
+        'checked': True,
+        'unchecked': False,
+        'never_checked': False,
+        'radio': '2',
+        'radio_off': None,
+        'radio_unset': None,
+    }
+
+
+def test_signatures_are_omitted():
+    pdf = make_form(
+        Dictionary(T=String('name'), FT=Name.Tx, V=String('Alice')),
+        Dictionary(T=String('signature'), FT=Name.Sig),
+    )
+    assert extract_values(pdf) == {'name': 'Alice'}
+
+
+def test_values_are_inherited():
+    pdf = Pdf.new()
+    parent = pdf.make_indirect(Dictionary(T=String('address'), FT=Name.Tx, V=String('Paris'), Kids=Array()))
+    for name, value in (('city', None), ('country', String('France'))):
+        kid = Dictionary(T=String(name), Parent=parent)
+        if value is not None:
+            kid.V = value
+        parent.Kids.append(pdf.make_indirect(kid))
+    pdf.Root.AcroForm = Dictionary(Fields=Array([parent]))
+    assert extract_values(reopen(pdf)) == {'address.city': 'Paris', 'address.country': 'France'}
+
+
+def test_choice_values():
+    pdf = make_form(
+        Dictionary(T=String('single'), FT=Name.Ch, V=String('Option 2')),
+        Dictionary(T=String('multiple'), FT=Name.Ch, V=Array([String('A'), String('C')])),
+    )
+    assert extract_values(pdf) == {'single': 'Option 2', 'multiple': ['A', 'C']}
+
+
+def test_first_of_duplicate_names_is_kept():
+    pdf = make_form(
+        Dictionary(T=String('name'), FT=Name.Tx, V=String('first')),
+        Dictionary(T=String('name'), FT=Name.Tx, V=String('second')),
+    )
+    assert extract_values(pdf) == {'name': 'first'}
+
+
+def test_csv_reports_values_with_no_column(tmp_path):
+    for file_name, field_names in (('a.pdf', ('name',)), ('b.pdf', ('name', 'city'))):
+        pdf = make_flat_form(*field_names)
+        for field in pdf.Root.AcroForm.Fields:
+            field.V = String(f'{file_name} {field.T}')
+        pdf.save(tmp_path / file_name)
+    runner = CliRunner()
+    paths = [str(tmp_path / 'a.pdf'), str(tmp_path / 'b.pdf')]
+    output = tmp_path / 'values.csv'
+    result = runner.invoke(extract_cli, ['--csv', '-j', '1', '-o', str(output), *paths])
+    assert result.exit_code == 1
+    assert output.read_text().splitlines() == ['.file,name', f'{paths[0]},a.pdf name', f'{paths[1]},b.pdf name']
+    assert f'{paths[1]}: no column for city' in result.output
+    assert 'Some values were left out of 1 documents.' in result.output
+    # JSON lines has no columns, so nothing is left out
+    result = runner.invoke(extract_cli, ['-j', '1', '-o', str(output), *paths])
+    assert result.exit_code == 0
+    assert '"city": "b.pdf city"' in output.read_text()
@@ -0,0 +1,137 @@
+from io import BytesIO
+from pikepdf import Array, Dictionary, Name, Pdf, String
+from pikepdf.form import Form
+from pdform.extract import extract_values
+from pdform.appearance import AppearanceStreamCache
+from pdform.fill_form import fill_form, fill_merged
+
+
+def make_hierarchical_form(pages=2, default_resources=True) -> Pdf:
+    """A form with one root field and a subform for each page, like those made by LiveCycle."""
+    pdf = Pdf.new()
+    font = pdf.make_indirect(Dictionary(Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica))
+    root = pdf.make_indirect(Dictionary(T=String('form1[0]'), Kids=Array()))
+    for page_no in range(pages):
+        pdf.add_blank_page(page_size=(612, 792))
+        page = pdf.pages[page_no]
+        subform = pdf.make_indirect(Dictionary(T=String(f'page{page_no}[0]'), Parent=root, Kids=Array()))
+        root.Kids.append(subform)
+        widgets = Array()
+        for i, name in enumerate(('name[0]', 'city[0]')):
+            widget = pdf.make_indirect(Dictionary(
+                Type=Name.Annot,
+                Subtype=Name.Widget,
+                Rect=[100, 600 - i * 40, 300, 620 - i * 40],
+                P=page.obj,
+                Parent=subform,
+                FT=Name.Tx,
+                T=String(name),
+                DA=String('/Helv 10 Tf 0 g'),
+            ))
+            subform.Kids.append(widget)
+            widgets.append(widget)
+        page.obj.Annots = widgets
+    pdf.Root.AcroForm = Dictionary(Fields=Array([root]), DA=String('/Helv 0 Tf 0 g'))
+    if default_resources:
+        pdf.Root.AcroForm.DR = Dictionary(Font=Dictionary(Helv=font))
+    return reopen(pdf)
+
+
+def make_flat_form(*names) -> Pdf:
+    """A single page form with a text field for each name."""
+    pdf = Pdf.new()
+    font = pdf.make_indirect(Dictionary(Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica))
+    pdf.add_blank_page(page_size=(612, 792))
+    page = pdf.pages[0]
+    fields = Array()
+    for i, name in enumerate(names):
+        fields.append(pdf.make_indirect(Dictionary(
+            Type=Name.Annot,
+            Subtype=Name.Widget,
+            Rect=[100, 600 - i * 40, 300, 620 - i * 40],
+            P=page.obj,
+            FT=Name.Tx,
+            T=String(name),
+            DA=String('/Helv 10 Tf 0 g'),
+        )))
+    page.obj.Annots = fields
+    pdf.Root.AcroForm = Dictionary(
+        Fields=Array(list(fields)),
+        DA=String('/Helv 0 Tf 0 g'),
+        DR=Dictionary(Font=Dictionary(Helv=font)),
+    )
+    return reopen(pdf)
+
+
+def reopen(pdf:Pdf) -> Pdf:
+    out = BytesIO()
+    pdf.save(out)
+    out.seek(0)
+    return Pdf.open(out)
+
+
+def test_fill_form():
+    pdf = make_hierarchical_form()
+    fill_form(pdf, {'form1[0].page0[0].name[0]': 'Alice', 'form1[0].page1[0].city[0]': 'Paris'})
+    values = extract_values(reopen(pdf))
+    assert values['form1[0].page0[0].name[0]'] == 'Alice'
+    assert values['form1[0].page1[0].city[0]'] == 'Paris'
+
+
+def test_fill_form_without_default_resources():
+    cache = AppearanceStreamCache()
+    # Fill twice, since the second document must not try to rebuild the appearances from the cache
+    for _ in range(2):
+        pdf = make_hierarchical_form(default_resources=False)
+        fill_form(pdf, {'form1[0].page0[0].name[0]': 'Alice', 'form1[0].page1[0].name[0]': 'Alice'}, appearance_cache=cache)
+        pdf = reopen(pdf)
+        assert extract_values(pdf)['form1[0].page0[0].name[0]'] == 'Alice'
+        assert Name.AP in pdf.pages[0].Annots[0]
+    assert len(cache) == 0
+
+
+def test_fill_merged_hierarchical_multipage():
+    pdf = make_hierarchical_form()
+    fill_merged(pdf, [
+        {'form1[0].page0[0].name[0]': 'Alice', 'form1[0].page1[0].city[0]': 'Paris'},
+        {'form1[0].page0[0].name[0]': 'Bob', 'form1[0].page1[0].city[0]': 'Oslo'},
+        {'form1[0].page0[0].name[0]': 'Carol'},
+    ])
+    pdf = reopen(pdf)
+    assert len(pdf.pages) == 6
+    # Exactly one root field per record, each holding both pages' subforms
+    roots = pdf.Root.AcroForm.Fields
+    assert sorted(str(root.T) for root in roots) == ['form1[0]_1', 'form1[0]_2', 'form1[0]_3']
+    for root in roots:
+        assert [str(kid.T) for kid in root.Kids] == ['page0[0]', 'page1[0]']
+    values = extract_values(pdf)
+    assert len(values) == 12
+    assert values['form1[0]_1.page0[0].name[0]'] == 'Alice'
+    assert values['form1[0]_1.page1[0].city[0]'] == 'Paris'
+    assert values['form1[0]_2.page0[0].name[0]'] == 'Bob'
+    assert values['form1[0]_2.page1[0].city[0]'] == 'Oslo'
+    assert values['form1[0]_3.page0[0].name[0]'] == 'Carol'
+    assert values['form1[0]_3.page1[0].city[0]'] is None
+    # Every widget on each page belongs to that record's copy of the field
+    form = Form(pdf)
+    for page_no, page in enumerate(pdf.pages):
+        record = page_no // 2 + 1
+        for widget in form.get_widget_annotations_for_page(page):
+            name = form.get_field_for_annotation(widget).fully_qualified_name
+            assert name.startswith(f'form1[0]_{record}.page{page_no % 2}[0].')
+
+
+def test_fill_merged_suffix_clashes_with_template_names():
+    # Acrobat often names fields like this, and record 2's Date would become Date_2
+    pdf = make_flat_form('Date', 'Date_2', 'Date_1')
+    fill_merged(pdf, [
+        {'Date': 'd1', 'Date_2': 'e1', 'Date_1': 'f1'},
+        {'Date': 'd2', 'Date_2': 'e2', 'Date_1': 'f2'},
+        {'Date': 'd3', 'Date_2': 'e3', 'Date_1': 'f3'},
+    ])
+    values = extract_values(reopen(pdf))
+    assert values == {
+        'Date_1': 'd1', 'Date_2_1': 'e1', 'Date_1_1': 'f1',
+        'Date_2': 'd2', 'Date_2_2': 'e2', 'Date_1_2': 'f2',
+        'Date_3': 'd3', 'Date_2_3': 'e3', 'Date_1_3': 'f3',
+    }
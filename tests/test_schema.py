@@ -0,0 +1,167 @@
+import json
+import pytest
+from click.testing import CliRunner
+from pikepdf import Array, Dictionary, Name, Pdf, Stream, String
+from pdform.extract import extract_values
+from pdform.fill_form import cli as fill_form_cli, fill_form
+from pdform.schema import ValidationIssue, make_schema, validate
+from .test_fill_form import reopen
+
+
+SCHEMA = {
+    'pages': 2,
+    'fields': {
+        'name': {'type': 'text', 'multiline': False, 'max_length': 5},
+        'notes': {'type': 'text', 'multiline': True, 'max_length': None},
+        'agree': {'type': 'checkbox', 'options': ['Yes', 'Off']},
+        'colour': {'type': 'radio', 'options': ['Red', 'Blue']},
+        'size': {'type': 'choice', 'options': ['S', 'M'], 'allow_edit': False},
+        'city': {'type': 'choice', 'options': ['Paris'], 'allow_edit': True},
+        'sig': {'type': 'signature'},
+        'reset': {'type': 'button'},
+    },
+}
+
+
+def make_checkbox_form() -> Pdf:
+    """A single page form with one checkbox, whose states are Yes and Off."""
+    pdf = Pdf.new()
+    pdf.add_blank_page(page_size=(612, 792))
+    page = pdf.pages[0]
+    checkbox = pdf.make_indirect(Dictionary(
+        Type=Name.Annot,
+        Subtype=Name.Widget,
+        Rect=[100, 600, 120, 620],
+        P=page.obj,
+        FT=Name.Btn,
+        T=String('agree'),
+        V=Name.Off,
+        AS=Name.Off,
+        AP=Dictionary(N=Dictionary(
+            Yes=Stream(pdf, b'0 0 20 20 re f'),
+            Off=Stream(pdf, b''),
+        )),
+    ))
+    page.obj.Annots = Array([checkbox])
+    pdf.Root.AcroForm = Dictionary(Fields=Array([checkbox]))
+    return reopen(pdf)
+
+
+def test_validate_valid_record():
+    assert validate({
+        'name': 'Alice',
+        'notes': 'Anything at all',
+        'agree': True,
+        'colour': '/Red',
+        'size': 'M',
+        'city': 'Oslo',
+        'sig': 'signature.png',
+    }, SCHEMA) == []
+    # Empty values are left empty, whatever the type of field
+    assert validate({'colour': None, 'reset': None}, SCHEMA) == []
+
+
+def test_validate_unknown_field():
+    assert validate({'nmae': 'Alice'}, SCHEMA) == [ValidationIssue(None, 'nmae', 'No such field in the form')]
+
+
+def test_validate_text():
+    issues = validate({'name': 'Alexander', 'notes': 'Alexander', 'city': 3}, SCHEMA)
+    assert [issue.field for issue in issues] == ['name', 'city']
+    assert issues[0].message == 'Value is 9 characters long, but the maximum length is 5'
+    assert issues[1].message == 'Expected a string, got int'
+
+
+def test_validate_checkbox():
+    for value in (True, False, 'Yes', '/Yes', 'Off'):
+        assert validate({'agree': value}, SCHEMA) == []
+    for value in ('No', '//Yes', 1):
+        assert [issue.field for issue in validate({'agree': value}, SCHEMA)] == ['agree']
+
+
+def test_validate_radio():
+    assert validate({'colour': 'Blue'}, SCHEMA) == []
+    issues = validate({'colour': 'Green'}, SCHEMA)
+    assert issues == [ValidationIssue(None, 'colour', "Expected one of the options (Blue, Red), got 'Green'")]
+
+
+def test_validate_choice():
+    # Only a choice field that allows editing can take values other than its options
+    assert [issue.field for issue in validate({'size': 'L', 'city': 'Oslo'}, SCHEMA)] == ['size']
+
+
+def test_validate_signature_and_button():
+    assert validate({'sig': {'img': 'signature.png'}}, SCHEMA) == []
+    issues = validate({'sig': {'image': 'signature.png'}, 'reset': True}, SCHEMA)
+    assert [issue.field for issue in issues] == ['sig', 'reset']
+
+
+def test_validate_stamps():
+    stamp = {'img': 'stamp.png', 'page': 2, 'rect': [0, 0, 100, 50]}
+    assert validate({'.stamps': [stamp]}, SCHEMA) == []
+    assert validate({'.stamps': stamp}, SCHEMA)[0].message == 'Expected a list of stamps'
+    issues = validate({'.stamps': [stamp, {**stamp, 'page': 3}]}, SCHEMA)
+    assert issues == [ValidationIssue(None, '.stamps', 'Stamp 2 is on page 3, but the form has 2 pages')]
+    issues = validate({'.stamps': [{**stamp, 'rect': [0, 0, 100]}]}, SCHEMA)
+    assert issues[0].message == 'Stamp 1 must have a "rect" of four numbers'
+
+
+def test_validate_batch_numbers_records():
+    issues = validate([{'name': 'Bob'}, 'Carol', {'nmae': 'Dave'}], SCHEMA)
+    assert issues == [
+        ValidationIssue(2, '', 'Record is not an object'),
+        ValidationIssue(3, 'nmae', 'No such field in the form'),
+    ]
+    assert str(issues[1]) == 'Record 3, nmae: No such field in the form'
+
+
+def test_checkbox_states_can_be_filled():
+    pdf = make_checkbox_form()
+    schema = make_schema(pdf)
+    assert sorted(schema['fields']['agree']['options']) == ['Off', 'Yes']
+    # Whatever the schema accepts can be filled
+    for value, checked in (('Yes', True), ('/Yes', True), ('Off', False), (True, True), (False, False)):
+        assert validate({'agree': value}, schema) == []
+        pdf = make_checkbox_form()
+        fill_form(pdf, {'agree': value})
+        assert extract_values(reopen(pdf)) == {'agree': checked}
+    assert validate({'agree': 'No'}, schema) != []
+    with pytest.raises(ValueError):
+        fill_form(make_checkbox_form(), {'agree': 'No'})
+
+
+def test_cli_validate_only_without_output(tmp_path):
+    template = tmp_path / 'template.pdf'
+    make_checkbox_form().save(template)
+    (tmp_path / 'good.json').write_text(json.dumps([{'agree': 'Yes'}, {'agree': False}]))
+    (tmp_path / 'bad.json').write_text(json.dumps([{'agree': 'Yes'}, {'agree': 'No'}]))
+    runner = CliRunner()
+    result = runner.invoke(fill_form_cli, ['--validate-only', '--merge', str(template), str(tmp_path / 'good.json')])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(fill_form_cli, ['--validate-only', '--merge', str(template), str(tmp_path / 'bad.json')])
+    assert result.exit_code == 1
+    assert 'Record 2, agree:' in result.output
+    # The data can also come from standard input
+    result = runner.invoke(fill_form_cli, ['--validate-only', str(template)], input='{"agree": true}')
+    assert result.exit_code == 0, result.output
+    # Without --validate-only, the output is still needed
+    result = runner.invoke(fill_form_cli, [str(template)], input='{"agree": true}')
+    assert result.exit_code == 2
+    assert "Missing argument 'OUTPUT'" in result.output
+
+
+def test_cli_schema_requires_validate_only(tmp_path):
+    template = tmp_path / 'template.pdf'
+    pdf = make_checkbox_form()
+    pdf.save(template)
+    schema = tmp_path / 'schema.json'
+    schema.write_text(json.dumps(make_schema(pdf)))
+    (tmp_path / 'data.json').write_text(json.dumps({'agree': 'Yes'}))
+    runner = CliRunner()
+    args = ['--schema', str(schema), str(template), str(tmp_path / 'out.pdf'), str(tmp_path / 'data.json')]
+    result = runner.invoke(fill_form_cli, args)
+    assert result.exit_code == 2
+    assert '--schema can only be used together with --validate-only' in result.output
+    assert not (tmp_path / 'out.pdf').exists()
+    result = runner.invoke(fill_form_cli, ['--validate-only', *args[:3], str(tmp_path / 'data.json')])
+    assert result.exit_code == 0, result.output